@@ -4,183 +4,426 @@ MySQL to PostgreSQL Dump Converter
 Converts a MySQL dump file to PostgreSQL format for importing into Supabase
 """
 
+import collections
+import concurrent.futures
+import io
+import mmap
+import os
+import queue
 import re
 import sys
+import threading
 
-def convert_mysql_to_postgres(input_file, output_file):
-    """Convert MySQL dump to PostgreSQL dump"""
-    
-    with open(input_file, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Remove MySQL-specific comments
-    content = re.sub(r'/\*![\d\s]*.*?\*/;?', '', content, flags=re.DOTALL)
-    
-    # Remove MySQL SET commands at the beginning
-    content = re.sub(r'SET @OLD_.*?;', '', content)
-    content = re.sub(r'SET @saved_.*?;', '', content)
+# google-re2 is optional: when installed, the multi-line patterns run on its
+# linear-time engine instead of the backtracking re module
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+# Maximum number of bytes of consecutive INSERT lines converted together
+INSERT_BLOCK_SIZE = 1 << 20
+
+# Approximate size of the slices of input handed to each conversion worker
+BATCH_SIZE = 4 << 20
+
+# Write buffer for the converted dump
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+# Number of converted batches that can wait for the writer thread
+PIPELINE_DEPTH = 4
+
+def compile_linear(pattern, flags=0):
+    """Compile pattern with RE2 when available, falling back to re for missing RE2 or unsupported syntax"""
+    if re2 is not None:
+        inline = ''.join(letter for flag, letter in ((re.IGNORECASE, 'i'), (re.DOTALL, 's')) if flags & flag)
+        try:
+            return re2.compile(b'(?%s)%s' % (inline.encode(), pattern) if inline else pattern)
+        except re2.error:
+            pass
+    return re.compile(pattern, flags)
+
+# Patterns are compiled once at import time and reused for every statement.
+# The dump is processed as raw bytes, so every pattern is a bytes pattern.
+# MySQL-only noise deleted in one scan: /*!...*/ comments, SET @OLD_/@saved_ and DISABLE/ENABLE KEYS
+_RE_STRIP = compile_linear(
+    rb'(?s:/\*![\d\s]*.*?\*/;?)'
+    rb'|SET @(?:OLD|saved)_.*?;'
+    rb'|(?i:ALTER TABLE [`"].*?[`"] (?:DIS|EN)ABLE KEYS;?)'
+)
+_RE_AUTO_INC_COL = compile_linear(rb'("[^"]+"|\w+)\s+(int|bigint|smallint)\s+NOT\s+NULL\s+AUTO_INCREMENT', re.IGNORECASE)
+_RE_ON_UPDATE = compile_linear(
+    rb'((?:TIMESTAMP|datetime)\s+NOT\s+NULL\s+DEFAULT\s+CURRENT_TIMESTAMP)\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP',
+    re.IGNORECASE
+)
+
+_WORD_REPLACEMENTS = {
+    b'int': b'INTEGER',
+    b'double': b'DOUBLE PRECISION',
+    b'datetime': b'TIMESTAMP',
+    b'varchar': b'VARCHAR',
+    b'longtext': b'TEXT',
+    b'mediumtext': b'TEXT',
+    b'current_timestamp': b'NOW()',
+}
+_GROUP_REPLACEMENTS = {
+    'strip': b'',
+    'boolean': b'BOOLEAN',
+    'smallint': b'SMALLINT',
+}
+
+def trie_pattern(groups):
+    """Build a regex alternation for words with shared prefixes factored out, trie style"""
+    # groups maps each word to the name of an empty group placed where the word ends,
+    # so match.lastgroup names the word that matched
+    trie = {}
+    for word, group in groups.items():
+        node = trie
+        for i in range(len(word)):
+            node = node.setdefault(word[i:i + 1], {})
+        node[b''] = group
+    
+    def walk(node):
+        branches = [re.escape(char) + walk(child) for char, child in sorted(node.items()) if char]
+        end = b'(?P<%s>)' % node[b''].encode() if b'' in node else b''
+        if not branches:
+            return end
+        if len(branches) == 1 and not end:
+            return branches[0]
+        # A word ending here makes the longer continuations optional
+        return end + b'(?:' + b'|'.join(branches) + b')' + (b'?' if end else b'')
+    
+    return walk(trie)
+
+# The replacement tables are folded at import time into one dispatch table keyed by
+# regex group name, so replacing a token is a single lookup on match.lastgroup
+_WORD_GROUPS = {word: 'word%d' % i for i, word in enumerate(_WORD_REPLACEMENTS)}
+_TOKEN_REPLACEMENTS = dict(_GROUP_REPLACEMENTS)
+_TOKEN_REPLACEMENTS.update((_WORD_GROUPS[word], replacement) for word, replacement in _WORD_REPLACEMENTS.items())
+
+# Table options, charsets and column types are rewritten in a single scan.
+# Plain keywords are matched through a prefix trie so the engine never retries a shared prefix.
+# The pattern is all lowercase and runs case-sensitively on a lowercased copy (see ci_sub).
+_RE_TOKENS = re.compile(
+    rb'(?P<strip>\s*engine\s*=\s*\w+'
+    rb'|\s*default charset\s*=\s*\w+'
+    rb'|\s*collate\s*=\s*\w+'
+    rb'|\s+character set\s+\w+'
+    rb'|\s+collate\s+\w+'
+    rb'|\s*auto_increment\s*=\s*\d+)'
+    rb'|(?P<boolean>tinyint\(1\))'
+    rb'|(?P<smallint>tinyint(?:\(\d+\))?)'
+    rb'|\b(?!int\s+serial)' + trie_pattern(_WORD_GROUPS) + rb'\b'
+)
+# Line endings that close a statement, in LF and CRLF dumps
+_STATEMENT_ENDS = (b';\n', b';\r\n')
+_RE_STATEMENT_END = re.compile(rb';\r?\n')
+_RE_CREATE_TABLE = compile_linear(
+    rb'(CREATE TABLE\s+(?:IF NOT EXISTS\s+)?"([^"]+)"\s*\()(.*?)(\n\)[^;]*;)', re.DOTALL | re.IGNORECASE
+)
+# FOREIGN KEY constraints and plain KEY indexes inside a CREATE TABLE body, one whole line each.
+# A match takes the line break before the member and leaves its own, LF or CRLF alike.
+_RE_TABLE_MEMBER = re.compile(
+    rb'\r?\n[ \t]*(?:(?P<fk>CONSTRAINT\s+"(?P<constraint>[^"]+)"\s+FOREIGN KEY\s+\((?P<columns>[^)]+)\)'
+    rb'\s+REFERENCES\s+"(?P<ref_table>[^"]+)"\s+\((?P<ref_columns>[^)]+)\)(?P<actions>[^,\r\n]*)),?'
+    rb'|KEY\s+"[^\r\n]*)',
+    re.IGNORECASE
+)
+
+def fix_quotes_in_inserts(insert_stmt):
+    """Replace MySQL-style escaped quotes with PostgreSQL style in INSERT statements"""
+    # Replace \' with '' in the INSERT statement.
+    # No "in" pre-check is needed for clean data: when there is nothing to replace,
+    # bytes.replace returns insert_stmt itself without building a copy, and a guard
+    # would only add a second scan for statements that do contain escapes.
+    return insert_stmt.replace(b"\\'", b"''")
+
+def replace_token(match):
+    """Return the PostgreSQL replacement for a token matched by _RE_TOKENS"""
+    return _TOKEN_REPLACEMENTS[match.lastgroup]
+
+def ci_sub(pattern, repl, content, lower):
+    """Case-insensitive pattern.sub(repl, content) for a lowercase pattern, matched on lower = content.lower()"""
+    # Matching the lowercased copy spares the regex engine from case-folding every character.
+    # bytes.lower() only touches ASCII letters, so match spans in lower line up with content;
+    # repl sees the lowercased match, so it must not depend on the original case.
+    parts = []
+    prev = 0
+    for match in pattern.finditer(lower):
+        parts.append(content[prev:match.start()])
+        parts.append(repl(match))
+        prev = match.end()
+    if not parts:
+        return content
+    parts.append(content[prev:])
+    return b''.join(parts)
+
+def extract_foreign_keys(stmt, foreign_keys):
+    """Drop KEY and FOREIGN KEY members from CREATE TABLE bodies, collecting the foreign keys"""
     
-    # Fix MySQL escaped quotes: \' -> '' (PostgreSQL style)
-    # This needs to be done carefully to handle strings properly
-    # Replace \' with '' but only in data values (not in comments)
-    def fix_quotes_in_inserts(match):
-        """Replace MySQL-style escaped quotes with PostgreSQL style in INSERT statements"""
-        insert_stmt = match.group(0)
-        # Replace \' with '' in the INSERT statement
-        insert_stmt = insert_stmt.replace("\\'", "''")
-        return insert_stmt
+    def rewrite_table(match):
+        table = match.group(2)
+        
+        def drop_member(member):
+            # Store the foreign key to add later; plain KEY lines are regular indexes and just go
+            if member.group('fk'):
+                foreign_keys.append({
+                    'table': table,
+                    'constraint': member.group('constraint'),
+                    'columns': member.group('columns'),
+                    'ref_table': member.group('ref_table'),
+                    'ref_columns': member.group('ref_columns'),
+                    'actions': member.group('actions').strip()
+                })
+            return b''
+        
+        # One scan over the body handles both kinds of member
+        body = _RE_TABLE_MEMBER.sub(drop_member, match.group(3))
+        # Dropping the last members leaves the comma of the member before them dangling,
+        # followed by the \r of a CRLF line ending
+        stripped = body.rstrip()
+        if stripped.endswith(b','):
+            body = stripped[:-1] + body[len(stripped):]
+        # The header and closing text are kept exactly as written, IF NOT EXISTS included
+        return match.group(1) + body + match.group(4)
+    
+    return _RE_CREATE_TABLE.sub(rewrite_table, stmt)
+
+def convert_statement(stmt, foreign_keys):
+    """Convert a single MySQL statement to PostgreSQL, collecting deferred foreign keys"""
+    # Backticks have already been replaced with double quotes by split_batch
     
-    # Apply the fix to INSERT statements
-    content = re.sub(r'INSERT INTO.*?;', fix_quotes_in_inserts, content, flags=re.DOTALL)
+    # INSERT statements only need their data quoting fixed
+    if stmt.startswith(b'INSERT INTO'):
+        # Fix MySQL escaped quotes: \' -> '' (PostgreSQL style)
+        # The whole statement is a plain string replace, no regex scan needed
+        return fix_quotes_in_inserts(stmt)
     
     # Remove LOCK TABLES and UNLOCK TABLES
-    content = re.sub(r'LOCK TABLES `.*?` WRITE;', '', content)
-    content = re.sub(r'UNLOCK TABLES;', '', content)
-    
-    # Replace backticks with double quotes for identifiers
-    content = content.replace('`', '"')
+    if stmt.startswith((b'LOCK TABLES', b'UNLOCK TABLES')):
+        return b''
     
-    # Replace ENGINE=InnoDB and similar
-    content = re.sub(r'\s*ENGINE\s*=\s*\w+', '', content, flags=re.IGNORECASE)
-    
-    # Replace DEFAULT CHARSET and COLLATE (table-level)
-    content = re.sub(r'\s*DEFAULT CHARSET\s*=\s*\w+', '', content, flags=re.IGNORECASE)
-    content = re.sub(r'\s*COLLATE\s*=\s*\w+', '', content, flags=re.IGNORECASE)
-    
-    # Remove CHARACTER SET and COLLATE from column definitions
-    content = re.sub(r'\s+CHARACTER SET\s+\w+', '', content, flags=re.IGNORECASE)
-    content = re.sub(r'\s+COLLATE\s+\w+', '', content, flags=re.IGNORECASE)
-    
-    # Replace AUTO_INCREMENT with GENERATED ALWAYS AS IDENTITY
-    # First, handle AUTO_INCREMENT in table options (at the end of CREATE TABLE)
-    content = re.sub(r'\s*AUTO_INCREMENT\s*=\s*\d+', '', content, flags=re.IGNORECASE)
+    # Remove MySQL-specific comments, MySQL SET commands and DISABLE/ENABLE KEYS
+    stmt = _RE_STRIP.sub(b'', stmt)
     
     # Handle AUTO_INCREMENT in column definitions
     # Pattern: "id" int NOT NULL AUTO_INCREMENT,
-    content = re.sub(
-        r'("?\w+"?)\s+(int|bigint|smallint)\s+NOT\s+NULL\s+AUTO_INCREMENT',
-        r'\1 SERIAL',
-        content,
-        flags=re.IGNORECASE
-    )
-    
-    # Replace int with INTEGER (more standard in PostgreSQL)
-    content = re.sub(r'\b(int)\b(?!\s+SERIAL)', 'INTEGER', content, flags=re.IGNORECASE)
-    
-    # Replace double with DOUBLE PRECISION
-    content = re.sub(r'\bdouble\b', 'DOUBLE PRECISION', content, flags=re.IGNORECASE)
-    
-    # Replace float with REAL (or keep as is, both work in PostgreSQL)
-    # content = re.sub(r'\bfloat\b', 'REAL', content, flags=re.IGNORECASE)
-    
-    # Replace tinyint(1) with BOOLEAN
-    content = re.sub(r'tinyint\(1\)', 'BOOLEAN', content, flags=re.IGNORECASE)
-    
-    # Replace tinyint with SMALLINT
-    content = re.sub(r'tinyint(\(\d+\))?', 'SMALLINT', content, flags=re.IGNORECASE)
-    
-    # Replace datetime with TIMESTAMP
-    content = re.sub(r'\bdatetime\b', 'TIMESTAMP', content, flags=re.IGNORECASE)
-    
-    # Replace varchar to be case-consistent
-    content = re.sub(r'\bvarchar\b', 'VARCHAR', content, flags=re.IGNORECASE)
-    
-    # Replace text types
-    content = re.sub(r'\blongtext\b', 'TEXT', content, flags=re.IGNORECASE)
-    content = re.sub(r'\bmediumtext\b', 'TEXT', content, flags=re.IGNORECASE)
+    stmt = _RE_AUTO_INC_COL.sub(rb'\1 SERIAL', stmt)
     
     # Fix timestamp defaults with ON UPDATE
     # MySQL: timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
     # PostgreSQL: timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP (remove ON UPDATE, handle with trigger if needed)
-    content = re.sub(
-        r'(TIMESTAMP\s+NOT\s+NULL\s+DEFAULT\s+CURRENT_TIMESTAMP)\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP',
-        r'\1',
-        content,
-        flags=re.IGNORECASE
-    )
+    stmt = _RE_ON_UPDATE.sub(rb'\1', stmt)
     
-    # Replace CURRENT_TIMESTAMP with NOW() for consistency
-    content = re.sub(r'\bCURRENT_TIMESTAMP\b', 'NOW()', content, flags=re.IGNORECASE)
+    # Remove ENGINE, charsets, collations and AUTO_INCREMENT=n, and map column types:
+    # int -> INTEGER, double -> DOUBLE PRECISION, tinyint(1) -> BOOLEAN, tinyint -> SMALLINT,
+    # datetime -> TIMESTAMP, longtext/mediumtext -> TEXT, CURRENT_TIMESTAMP -> NOW()
+    stmt = ci_sub(_RE_TOKENS, replace_token, stmt, stmt.lower())
     
     # Handle KEY definitions and extract FOREIGN KEY constraints
     # We need to defer foreign keys to avoid dependency issues
-    lines = content.split('\n')
-    new_lines = []
-    foreign_keys = []
-    in_create_table = False
-    current_table = None
+    if b'CREATE TABLE' in stmt.upper():
+        stmt = extract_foreign_keys(stmt, foreign_keys)
     
+    return stmt
+
+def ends_in_comment(line, in_comment=False):
+    """Whether line, starting inside a /*! ... */ block if in_comment, ends inside one"""
+    # These blocks do not nest, so only the last opening and closing marks matter
+    opened = line.rfind(b'/*!')
+    closed = line.rfind(b'*/')
+    if opened > closed:
+        return True
+    return in_comment and closed == -1
+
+def convert_lines(lines, write, foreign_keys):
+    """Convert MySQL dump lines statement by statement, passing the output to write"""
+    # after_blank tracks whether the output so far ends with a blank line, so runs of
+    # them collapse into one; write_batches stitches batches together the same way
+    after_blank = False
+    
+    def emit(stmt):
+        nonlocal after_blank
+        converted = convert_statement(stmt, foreign_keys)
+        if converted and not converted.isspace():
+            write(converted)
+            after_blank = False
+        elif not after_blank:
+            # A statement that converts to nothing leaves a blank line in its place
+            write(b'\n')
+            after_blank = True
+    
+    # The loop body runs once per input line, so it sticks to C-level bytes methods
+    # that never copy the line (strip()/rstrip() would copy every multi-MB INSERT)
+    
+    # Consecutive single-line INSERTs are converted as one block of up to
+    # INSERT_BLOCK_SIZE bytes, so one-row-per-line dumps pay the
+    # per-statement conversion overhead once per block instead of once per row
+    inserts = []
+    inserts_size = 0
+    statement = []
+    in_comment = False
     for line in lines:
-        # Track if we're inside a CREATE TABLE statement
-        if 'CREATE TABLE' in line.upper():
-            in_create_table = True
-            # Extract table name
-            match = re.search(r'CREATE TABLE\s+"([^"]+)"', line, re.IGNORECASE)
-            if match:
-                current_table = match.group(1)
-        
-        # Extract FOREIGN KEY constraints to add later
-        if in_create_table and re.search(r'CONSTRAINT\s+"[^"]+"\s+FOREIGN KEY', line, re.IGNORECASE):
-            # Store the foreign key to add later
-            fk_match = re.search(
-                r'CONSTRAINT\s+"([^"]+)"\s+FOREIGN KEY\s+\(([^)]+)\)\s+REFERENCES\s+"([^"]+)"\s+\(([^)]+)\)(.+)',
-                line,
-                re.IGNORECASE
-            )
-            if fk_match and current_table:
-                constraint_name = fk_match.group(1)
-                fk_columns = fk_match.group(2)
-                ref_table = fk_match.group(3)
-                ref_columns = fk_match.group(4)
-                actions = fk_match.group(5).rstrip(',').strip()
-                
-                foreign_keys.append({
-                    'table': current_table,
-                    'constraint': constraint_name,
-                    'columns': fk_columns,
-                    'ref_table': ref_table,
-                    'ref_columns': ref_columns,
-                    'actions': actions
-                })
-            # Skip this line from the CREATE TABLE
-            continue
+        if not statement:
+            if line.startswith(b'INSERT INTO') and line.endswith(_STATEMENT_ENDS):
+                inserts.append(line)
+                inserts_size += len(line)
+                if inserts_size >= INSERT_BLOCK_SIZE:
+                    emit(b''.join(inserts))
+                    inserts = []
+                    inserts_size = 0
+                continue
+            if inserts:
+                emit(b''.join(inserts))
+                inserts = []
+                inserts_size = 0
+            if line.isspace():
+                # Runs of blank lines are collapsed into one as they are written
+                if not after_blank:
+                    write(b'\n')
+                    after_blank = True
+                continue
+            if line.startswith(b'--'):
+                # Comments between statements pass straight through
+                write(line)
+                after_blank = False
+                continue
+            if line.endswith(_STATEMENT_ENDS) and not ends_in_comment(line):
+                # Other single-line statements skip the buffer
+                emit(line)
+                continue
         
-        # Skip KEY lines that are not FOREIGN KEY or PRIMARY KEY
-        if in_create_table and re.match(r'\s*KEY\s+"', line, re.IGNORECASE):
-            # Skip this line (it's a regular index, we'll handle it separately if needed)
+        statement.append(line)
+        # A ';' inside a /*! ... */ block, such as a line of a trigger body, does not
+        # end the statement; the block is removed as a whole once it is closed
+        in_comment = ends_in_comment(line, in_comment)
+        if in_comment:
             continue
-        
-        # Check if we're ending the CREATE TABLE
-        if in_create_table and ')' in line and ';' in line:
-            in_create_table = False
-            current_table = None
-        
-        new_lines.append(line)
-    
-    content = '\n'.join(new_lines)
-    
-    # Clean up trailing commas before closing parentheses in CREATE TABLE statements
-    content = re.sub(r',(\s*\n\s*\);)', r'\1', content)
-    
-    # Add foreign keys at the end
-    if foreign_keys:
-        fk_statements = ['\n\n-- Foreign key constraints (added after table creation to avoid dependency issues)\n']
-        for fk in foreign_keys:
-            fk_stmt = f'ALTER TABLE "{fk["table"]}" ADD CONSTRAINT "{fk["constraint"]}" FOREIGN KEY ({fk["columns"]}) REFERENCES "{fk["ref_table"]}" ({fk["ref_columns"]}) {fk["actions"]};'
-            fk_statements.append(fk_stmt)
-        content += '\n'.join(fk_statements)
-    
-    # Remove DISABLE/ENABLE KEYS
-    content = re.sub(r'ALTER TABLE ".*?" DISABLE KEYS;?', '', content, flags=re.IGNORECASE)
-    content = re.sub(r'ALTER TABLE ".*?" ENABLE KEYS;?', '', content, flags=re.IGNORECASE)
+        if line.endswith(_STATEMENT_ENDS) or line.rstrip().endswith(b';'):
+            emit(b''.join(statement))
+            statement = []
+    
+    # Flush a trailing block of INSERTs or statement without a terminating semicolon
+    if inserts:
+        emit(b''.join(inserts))
+    if statement:
+        emit(b''.join(statement))
+
+def split_batch(batch):
+    """Iterate over the lines of a batch, with backticks replaced by double quotes"""
+    # Identifiers are requoted in one pass over the whole batch: a single-byte replace
+    # is a memchr-driven scan in C, far cheaper than a separate pass per statement
+    return iter(io.BytesIO(batch.replace(b'`', b'"')).readline, b'')
+
+def convert_batch(batch):
+    """Convert a batch of complete dump lines, returning the output and its foreign keys"""
+    # Converted statements accumulate in one growing buffer rather than a list of pieces
+    output = io.BytesIO()
+    foreign_keys = []
+    convert_lines(split_batch(batch), output.write, foreign_keys)
+    return output.getvalue(), foreign_keys
+
+def iter_batches(mm):
+    """Yield BATCH_SIZE-ish slices of a mapped dump, each ending on a statement boundary"""
+    # Where supported, the kernel is asked to start reading the next batch while the
+    # current one is converted, so the read overlaps the conversion
+    willneed = getattr(mmap, 'MADV_WILLNEED', None)
+    start = 0
+    while start < len(mm):
+        # A line ending in ';' closes the statement in progress, unless it is inside a
+        # /*! ... */ block such as a trigger body; then the cut moves past the block
+        pos = start + BATCH_SIZE
+        while True:
+            cut = _RE_STATEMENT_END.search(mm, pos)
+            if cut is None:
+                end = len(mm)
+                break
+            end = cut.end()
+            opened = mm.rfind(b'/*!', start, end)
+            if opened <= mm.rfind(b'*/', start, end):
+                break
+            closed = mm.find(b'*/', opened)
+            pos = len(mm) if closed == -1 else closed
+        if willneed is not None and end < len(mm):
+            mm.madvise(willneed, end - end % mmap.PAGESIZE, BATCH_SIZE + mmap.PAGESIZE)
+        yield mm[start:end]
+        start = end
+
+def map_in_order(executor, fn, items, window):
+    """Like executor.map, but with at most window items in flight so input is read lazily"""
+    pending = collections.deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def write_batches(results, write, foreign_keys, after_blank=False):
+    """Write converted batches in order, collecting their foreign keys"""
+    for converted, batch_foreign_keys in results:
+        # Each batch collapses its own blank lines, but can still open with one
+        # right after the previous batch ended with one
+        if after_blank and converted.startswith(b'\n'):
+            converted = converted[1:]
+        if converted:
+            write(converted)
+            # Output always ends in a newline, so a lone newline is a blank line too
+            after_blank = converted == b'\n' or converted.endswith(b'\n\n')
+        foreign_keys.extend(batch_foreign_keys)
+    return after_blank
+
+def convert_parallel(mm, write, foreign_keys, workers, after_blank=False):
+    """Convert a mapped dump in batches across a process pool, writing results in input order"""
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        try:
+            results = map_in_order(executor, convert_batch, iter_batches(mm), 2 * workers)
+            return write_batches(results, write, foreign_keys, after_blank)
+        except BaseException:
+            executor.shutdown(cancel_futures=True)
+            raise
+
+def write_behind(write, pending, errors):
+    """Pass queued chunks to write in order until a None sentinel, recording any failure"""
+    for data in iter(pending.get, None):
+        # After a failure the queue is still drained so the producer never blocks on it
+        if not errors:
+            try:
+                write(data)
+            except BaseException as e:
+                errors.append(e)
+
+def convert_serial(mm, write, foreign_keys, after_blank=False):
+    """Convert a mapped dump batch by batch, writing results from a background thread"""
+    # The writer thread spends most of its time in write syscalls with the GIL
+    # released, so output overlaps the conversion of the next batch
+    pending = queue.Queue(PIPELINE_DEPTH)
+    errors = []
+    writer = threading.Thread(target=write_behind, args=(write, pending, errors))
+    writer.start()
+    
+    def put(data):
+        # Stop converting as soon as the writer has failed, e.g. on a full disk
+        if errors:
+            raise errors[0]
+        pending.put(data)
     
-    # Clean up multiple blank lines
-    content = re.sub(r'\n\s*\n\s*\n+', '\n\n', content)
+    try:
+        after_blank = write_batches(map(convert_batch, iter_batches(mm)), put, foreign_keys, after_blank)
+    finally:
+        pending.put(None)
+        writer.join()
+    if errors:
+        raise errors[0]
+    return after_blank
+
+def convert_mysql_to_postgres(input_file, output_file, workers=None):
+    """Convert MySQL dump to PostgreSQL dump"""
     
     # Add PostgreSQL-specific header
-    postgres_header = """-- Converted from MySQL to PostgreSQL
+    postgres_header = b"""-- Converted from MySQL to PostgreSQL
 -- Compatible with Supabase
--- Original MySQL dump: {}
+-- Original MySQL dump: %s
 
 SET statement_timeout = 0;
 SET lock_timeout = 0;
@@ -189,13 +432,44 @@ SET standard_conforming_strings = on;
 SET check_function_bodies = false;
 SET client_min_messages = warning;
 
-""".format(input_file)
+""" % input_file.encode()
     
-    content = postgres_header + content
+    if workers is None:
+        workers = os.cpu_count() or 1
     
-    # Write the converted content
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(content)
+    foreign_keys = []
+    # The header ends with a blank line
+    after_blank = True
+    
+    # Stream the dump statement by statement so memory stays bounded by the batch size.
+    # Working on the raw bytes skips decoding the whole input and encoding the whole output.
+    with open(input_file, 'rb') as f, open(output_file, 'wb', buffering=OUTPUT_BUFFER_SIZE) as out:
+        out.write(postgres_header)
+        
+        # mmap cannot map an empty file, which converts to just the header
+        size = os.fstat(f.fileno()).st_size
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Statements are independent, so batches are converted in parallel once there
+                # is more than one of them; a single worker converts them in turn.
+                # The pool's processes already convert while the main thread writes, and they
+                # must not be forked while a writer thread runs, so only the serial path has one.
+                if workers > 1 and size > BATCH_SIZE:
+                    after_blank = convert_parallel(mm, out.write, foreign_keys, workers, after_blank)
+                else:
+                    after_blank = convert_serial(mm, out.write, foreign_keys, after_blank)
+        
+        # Add foreign keys at the end
+        if foreign_keys:
+            if not after_blank:
+                out.write(b'\n')
+            out.write(b'-- Foreign key constraints (added after table creation to avoid dependency issues)\n\n')
+            # Each statement is formatted straight into the output buffer, newline included
+            for fk in foreign_keys:
+                actions = b' ' + fk['actions'] if fk['actions'] else b''
+                out.write(b'ALTER TABLE "%s" ADD CONSTRAINT "%s" FOREIGN KEY (%s) REFERENCES "%s" (%s)%s;\n' % (
+                    fk['table'], fk['constraint'], fk['columns'], fk['ref_table'], fk['ref_columns'], actions
+                ))
     
     print(f"✅ Successfully converted MySQL dump to PostgreSQL format")
     print(f"📄 Input:  {input_file}")
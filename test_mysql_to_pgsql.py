@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Regression tests for the MySQL to PostgreSQL converter
+Run with: python3 -m unittest test_mysql_to_pgsql
+"""
+
+import contextlib
+import io
+import mmap
+import os
+import tempfile
+import unittest
+import warnings
+
+import mysql_to_pgsql
+
+SAMPLE_DUMP = b"""-- MySQL dump 10.13
+/*!40101 SET @OLD_CHARACTER_SET_CLIENT=@@CHARACTER_SET_CLIENT */;
+/*!40101 SET NAMES utf8mb4 */;
+
+--
+-- Table structure for table `associations`
+--
+
+DROP TABLE IF EXISTS `associations`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+CREATE TABLE `associations` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `name` varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL,
+  `active` tinyint(1) DEFAULT '1',
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB AUTO_INCREMENT=3 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+LOCK TABLES `associations` WRITE;
+/*!40000 ALTER TABLE `associations` DISABLE KEYS */;
+INSERT INTO `associations` VALUES (1,'John\\'s Club',1);
+INSERT INTO `associations` VALUES (2,'Other',0);
+/*!40000 ALTER TABLE `associations` ENABLE KEYS */;
+UNLOCK TABLES;
+
+
+CREATE TABLE `users` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `association_id` int DEFAULT NULL,
+  `balance` double DEFAULT '0',
+  `created_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  KEY `idx_association` (`association_id`),
+  CONSTRAINT `users_assoc_fk` FOREIGN KEY (`association_id`) REFERENCES `associations` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+LOCK TABLES `users` WRITE;
+INSERT INTO `users` VALUES (1,1,100.5,'2025-01-01 00:00:00'),(2,2,0,'2025-01-02 00:00:00');
+UNLOCK TABLES;
+DELIMITER ;;
+/*!50003 CREATE*/ /*!50017 DEFINER=`root`@`localhost`*/ /*!50003 TRIGGER `users_bi` BEFORE INSERT ON `users` FOR EACH ROW BEGIN
+  SET NEW.balance = 0;
+  SET NEW.created_at = NOW();
+END */;;
+DELIMITER ;
+"""
+
+
+class ConverterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        # Tests shrink the batch sizes to force many batches out of a small dump
+        for name in ('BATCH_SIZE', 'INSERT_BLOCK_SIZE'):
+            self.addCleanup(setattr, mysql_to_pgsql, name, getattr(mysql_to_pgsql, name))
+
+    def convert(self, dump, workers=1, batch_size=4 << 20, insert_block_size=1 << 20):
+        """Run the converter on dump and return the output file contents"""
+        mysql_to_pgsql.BATCH_SIZE = batch_size
+        mysql_to_pgsql.INSERT_BLOCK_SIZE = insert_block_size
+        input_file = os.path.join(self.tmpdir.name, 'dump.sql')
+        output_file = os.path.join(self.tmpdir.name, 'dump_postgres.sql')
+        with open(input_file, 'wb') as f:
+            f.write(dump)
+        with contextlib.redirect_stdout(io.StringIO()):
+            mysql_to_pgsql.convert_mysql_to_postgres(input_file, output_file, workers)
+        with open(output_file, 'rb') as f:
+            return f.read()
+
+
+class TestConversion(ConverterTestCase):
+    def test_sample_dump(self):
+        output = self.convert(SAMPLE_DUMP)
+        self.assertNotIn(b'`', output)
+        self.assertNotIn(b'LOCK TABLES', output)
+        self.assertNotIn(b'ENGINE', output)
+        self.assertNotIn(b'TRIGGER', output)
+        self.assertNotIn(b'KEY "idx_association"', output)
+        self.assertIn(b'"id" SERIAL,', output)
+        self.assertIn(b'"balance" DOUBLE PRECISION DEFAULT \'0\',', output)
+        self.assertIn(b'"created_at" TIMESTAMP NOT NULL DEFAULT NOW(),', output)
+        self.assertIn(b"VALUES (1,'John''s Club',1);", output)
+        self.assertIn(b'  PRIMARY KEY ("id")\n);\n', output)
+        self.assertTrue(output.endswith(
+            b'ALTER TABLE "users" ADD CONSTRAINT "users_assoc_fk" FOREIGN KEY ("association_id") '
+            b'REFERENCES "associations" ("id") ON DELETE CASCADE;\n'
+        ))
+
+    def test_parallel_matches_serial(self):
+        expected = self.convert(SAMPLE_DUMP)
+        for workers in (1, 3):
+            for batch_size in (1, 64, 512):
+                with self.subTest(workers=workers, batch_size=batch_size):
+                    output = self.convert(SAMPLE_DUMP, workers, batch_size, insert_block_size=64)
+                    self.assertEqual(output, expected)
+
+    def test_pool_forks_without_threads(self):
+        # Forking while another thread runs is unsafe, and Python 3.12+ warns about it.
+        # The warning is recorded rather than turned into an error, because os.fork()
+        # swallows an error raised by its own warning.
+        expected = self.convert(SAMPLE_DUMP)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always', DeprecationWarning)
+            output = self.convert(SAMPLE_DUMP, 3, batch_size=64)
+        self.assertEqual([str(w.message) for w in caught if issubclass(w.category, DeprecationWarning)], [])
+        self.assertEqual(output, expected)
+
+    def test_blank_lines_collapse_across_batches(self):
+        # LOCK/UNLOCK convert to blank lines, so with one statement per batch
+        # the blank runs straddle batch boundaries
+        dump = b'CREATE TABLE `a` (\n  `id` int\n);\n\n\nLOCK TABLES `a` WRITE;\n\nUNLOCK TABLES;\n\n' * 20
+        expected = self.convert(dump)
+        self.assertNotIn(b'\n\n\n', expected)
+        for workers in (1, 3):
+            with self.subTest(workers=workers):
+                self.assertEqual(self.convert(dump, workers, batch_size=1), expected)
+
+    def test_crlf_dump(self):
+        dump = SAMPLE_DUMP.replace(b'\n', b'\r\n')
+        output = self.convert(dump)
+        self.assertNotIn(b',\r\n)', output)
+        self.assertIn(b'  PRIMARY KEY ("id")\r\n);\r\n', output)
+        self.assertIn(b'ADD CONSTRAINT "users_assoc_fk"', output)
+        self.assertEqual(self.convert(dump, 3, batch_size=64, insert_block_size=64), output)
+
+    def test_crlf_batches_end_on_statements(self):
+        dump = SAMPLE_DUMP.replace(b'\n', b'\r\n')
+        mysql_to_pgsql.BATCH_SIZE = 64
+        with tempfile.TemporaryFile() as f:
+            f.write(dump)
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                batches = list(mysql_to_pgsql.iter_batches(mm))
+        self.assertGreater(len(batches), 1)
+        self.assertEqual(b''.join(batches), dump)
+        for batch in batches[:-1]:
+            self.assertTrue(batch.endswith(b';\r\n'))
+
+    def test_batches_do_not_split_conditional_comments(self):
+        mysql_to_pgsql.BATCH_SIZE = 1
+        with tempfile.TemporaryFile() as f:
+            f.write(SAMPLE_DUMP)
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                batches = list(mysql_to_pgsql.iter_batches(mm))
+        self.assertEqual(b''.join(batches), SAMPLE_DUMP)
+        trigger = [batch for batch in batches if b'TRIGGER' in batch]
+        self.assertEqual(len(trigger), 1)
+        self.assertTrue(trigger[0].endswith(b'END */;;\n'))
+
+    def test_create_table_if_not_exists(self):
+        foreign_keys = []
+        stmt = (
+            b'CREATE TABLE IF NOT EXISTS "t" (\n'
+            b'  "x" int,\n'
+            b'  KEY "k" ("x"),\n'
+            b'  CONSTRAINT "t_fk" FOREIGN KEY ("x") REFERENCES "u" ("id")\n'
+            b') ENGINE=InnoDB;\n'
+        )
+        self.assertEqual(
+            mysql_to_pgsql.convert_statement(stmt, foreign_keys),
+            b'CREATE TABLE IF NOT EXISTS "t" (\n  "x" INTEGER\n);\n'
+        )
+        self.assertEqual([fk['constraint'] for fk in foreign_keys], [b't_fk'])
+
+    def test_foreign_key_without_actions(self):
+        dump = (
+            b'CREATE TABLE `t` (\n'
+            b'  `x` int,\n'
+            b'  CONSTRAINT `t_fk` FOREIGN KEY (`x`) REFERENCES `u` (`id`)\n'
+            b') ENGINE=InnoDB;\n'
+        )
+        output = self.convert(dump)
+        self.assertIn(b'CREATE TABLE "t" (\n  "x" INTEGER\n);\n', output)
+        self.assertTrue(output.endswith(
+            b'ALTER TABLE "t" ADD CONSTRAINT "t_fk" FOREIGN KEY ("x") REFERENCES "u" ("id");\n'
+        ))
+
+
+if __name__ == '__main__':
+    unittest.main()